@@ -0,0 +1,7 @@
+"""Shared compiled regular expressions."""
+
+import re
+
+# Pattern for sequentially numbered images (001.jpg, 002.png, etc.)
+# Use with fullmatch(); group 1 is the image number
+IMAGE_SEQUENCE_RE = re.compile(r'0*(\d+)\.(?:jpg|jpeg|png|gif|bmp|webp)', re.IGNORECASE)
@@ -3,19 +3,32 @@
 import argparse
 import logging
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
 
+from .file_detector import detect_file_type, set_cache_persistence
 from .processor import convert_cbr_to_cbz, fix_extension
-from .packager import package_to_cbr
+from .packager import package_to_cbz
 from .scanner import scan_directory
 from .utils import log_operation
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(levelname)s: %(message)s'
-)
+
+def _configure_logging():
+    """Configure console logging; also run in each worker process."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(levelname)s: %(message)s'
+    )
+
+
+_configure_logging()
 logger = logging.getLogger(__name__)
 
+# Header reads are tiny and I/O bound, so many threads help hide per-file
+# latency, especially on network filesystems
+DETECT_WORKERS = 32
+
 
 def main():
     """Main CLI entry point."""
@@ -27,6 +40,7 @@ Examples:
   %(prog)s /path/to/comics
   %(prog)s /path/to/comics --dry-run
   %(prog)s /path/to/comics --no-recursive
+  %(prog)s /path/to/comics --jobs 4
         """
     )
     
@@ -56,6 +70,19 @@ Examples:
         help='Do not scan subdirectories'
     )
     
+    parser.add_argument(
+        '--compress',
+        action='store_true',
+        help='Deflate pages when converting CBR to CBZ (default: store uncompressed)'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=None,
+        help='Number of parallel CBR to CBZ conversions (default: number of CPUs)'
+    )
+    
     args = parser.parse_args()
     
     # Validate directory
@@ -67,9 +94,13 @@ Examples:
         logger.error(f"Path is not a directory: {args.directory}")
         sys.exit(1)
     
+    if args.jobs is not None and args.jobs < 1:
+        logger.error(f"--jobs must be at least 1, got {args.jobs}")
+        sys.exit(1)
+    
     # Run the fixer
     try:
-        run_fixer(args.directory, args.dry_run, args.recursive)
+        run_fixer(args.directory, args.dry_run, args.recursive, compress=args.compress, jobs=args.jobs)
     except KeyboardInterrupt:
         logger.info("\nInterrupted by user")
         sys.exit(1)
@@ -78,7 +109,8 @@ Examples:
         sys.exit(1)
 
 
-def run_fixer(directory: Path, dry_run: bool, recursive: bool):
+def run_fixer(directory: Path, dry_run: bool, recursive: bool, compress: bool = False,
+              jobs: Optional[int] = None):
     """
     Run the CBR/CBZ fixer on a directory.
     
@@ -86,12 +118,17 @@ def run_fixer(directory: Path, dry_run: bool, recursive: bool):
         directory: Directory to process
         dry_run: If True, only show what would be done
         recursive: If True, scan subdirectories
+        compress: If True, deflate pages when converting CBR to CBZ
+        jobs: Number of parallel conversions (default: number of CPUs)
     """
     if dry_run:
         logger.info("=" * 60)
         logger.info("DRY RUN MODE - No files will be modified")
         logger.info("=" * 60)
     
+    # A dry run must not write anything, including the detection cache
+    set_cache_persistence(not dry_run)
+    
     logger.info(f"Scanning directory: {directory}")
     if recursive:
         logger.info("Recursive mode: enabled")
@@ -114,61 +151,93 @@ def run_fixer(directory: Path, dry_run: bool, recursive: bool):
     logger.info("Processing files...")
     logger.info("=" * 60)
     
+    # Read all archive headers up front, concurrently
+    file_types = _detect_all(scan_result.cbr_files + scan_result.cbz_files)
+    
     # Process CBR files
+    # When running serially, conversions happen inline so their output
+    # stays under each file's header. Otherwise the slow CBR to CBZ
+    # conversions are collected and run in parallel afterwards
+    serial = dry_run or jobs == 1
     fixed_count = 0
     converted_count = 0
+    to_convert: List[Tuple[Union[str, Path], str, bool]] = []
+    # CBZ paths already being produced, so no output is written twice
+    claimed_targets: Set[Path] = set()
     
     for cbr_file in scan_result.cbr_files:
         logger.info(f"\nProcessing CBR file: {cbr_file}")
+        actual_type = file_types[cbr_file]
         
         # Check and fix extension if needed
-        fixed_path = fix_extension(cbr_file, dry_run=dry_run)
+        fixed_path = fix_extension(cbr_file, dry_run=dry_run, actual_type=actual_type)
         if fixed_path:
             fixed_count += 1
             # If extension was fixed (meaning it was actually a CBZ), skip conversion
             continue
         
+        # A mislabeled CBR .cbz sibling (e.g. left linked to this file by an
+        # interrupted run) is fixed and converted from the CBZ loop below
+        cbz_sibling = str(Path(cbr_file).with_suffix('.cbz'))
+        if file_types.get(cbz_sibling) == 'CBR':
+            logger.info(f"Leaving conversion of {cbr_file} to its mislabeled copy {cbz_sibling}")
+            continue
+        
         # Convert CBR to CBZ (only if it's actually a valid CBR)
-        converted_path = convert_cbr_to_cbz(cbr_file, dry_run=dry_run)
-        if converted_path:
-            converted_count += 1
+        if not _claim_target(cbr_file, claimed_targets):
+            continue
+        if serial:
+            if convert_cbr_to_cbz(cbr_file, dry_run=dry_run, compress=compress,
+                                  actual_type=actual_type):
+                converted_count += 1
+        else:
+            to_convert.append((cbr_file, actual_type, False))
     
     # Process CBZ files
     for cbz_file in scan_result.cbz_files:
         logger.info(f"\nProcessing CBZ file: {cbz_file}")
         
-        # Detect actual file type first
-        from .file_detector import detect_file_type
-        actual_type = detect_file_type(cbz_file)
+        actual_type = file_types[cbz_file]
         
         if actual_type == 'CBR':
             # File has .cbz extension but is actually a CBR
             # Step 1: Fix extension to .cbr
-            fixed_path = fix_extension(cbz_file, dry_run=dry_run)
+            fixed_path = fix_extension(cbz_file, dry_run=dry_run, actual_type=actual_type)
             if fixed_path:
                 fixed_count += 1
                 # Step 2: Convert the .cbr file to .cbz
+                if not _claim_target(fixed_path, claimed_targets):
+                    continue
                 if dry_run:
                     # In dry-run, show what would happen: convert the fixed .cbr to .cbz
                     cbz_output = fixed_path.with_suffix('.cbz')
                     log_operation(f"Would then convert CBR to CBZ: {fixed_path} -> {cbz_output}", dry_run=True)
                     converted_count += 1
-                else:
+                elif serial:
                     # In normal mode, convert the newly created .cbr file
-                    converted_path = convert_cbr_to_cbz(fixed_path, dry_run=dry_run)
-                    if converted_path:
+                    # (a hard link or copy of the same data, so same type)
+                    # and replace the mislabeled .cbz it was fixed from
+                    if convert_cbr_to_cbz(fixed_path, dry_run=dry_run, compress=compress,
+                                          actual_type=actual_type, replace_existing=True):
                         converted_count += 1
+                else:
+                    to_convert.append((fixed_path, actual_type, True))
         else:
             # File is actually a CBZ - just check if extension needs fixing
-            fixed_path = fix_extension(cbz_file, dry_run=dry_run)
+            fixed_path = fix_extension(cbz_file, dry_run=dry_run, actual_type=actual_type)
             if fixed_path:
                 fixed_count += 1
     
+    if to_convert:
+        # Each conversion's own log line names the file it is about
+        logger.info(f"\nConverting {len(to_convert)} CBR files to CBZ in parallel...")
+        converted_count += _convert_all(to_convert, compress=compress, jobs=jobs)
+    
     # Package image sequences
     packaged_count = 0
     for img_dir in scan_result.image_sequence_dirs:
         logger.info(f"\nProcessing image sequence directory: {img_dir}")
-        packaged_path = package_to_cbr(img_dir, dry_run=dry_run)
+        packaged_path = package_to_cbz(img_dir, dry_run=dry_run)
         if packaged_path:
             packaged_count += 1
     
@@ -187,5 +256,78 @@ def run_fixer(directory: Path, dry_run: bool, recursive: bool):
         logger.info("=" * 60)
 
 
+def _claim_target(cbr_file: Union[str, Path], claimed: Set[Path]) -> bool:
+    """
+    Reserve the CBZ path a conversion of cbr_file would write.
+    
+    Args:
+        cbr_file: CBR file about to be converted
+        claimed: CBZ paths already reserved in this run
+        
+    Returns:
+        True if the path was free, False if another conversion owns it
+    """
+    cbz_path = Path(cbr_file).with_suffix('.cbz')
+    if cbz_path in claimed:
+        logger.info(f"Skipping conversion of {cbr_file}: {cbz_path} is already being created")
+        return False
+    claimed.add(cbz_path)
+    return True
+
+
+def _detect_all(files: List[str]) -> Dict[str, str]:
+    """
+    Detect the actual type of many files using a thread pool.
+    
+    Args:
+        files: Files to check
+        
+    Returns:
+        Mapping of each file to its detected type
+    """
+    if len(files) < 2:
+        return {f: detect_file_type(f) for f in files}
+    
+    with ThreadPoolExecutor(max_workers=min(DETECT_WORKERS, len(files))) as executor:
+        return dict(zip(files, executor.map(detect_file_type, files)))
+
+
+def _convert_all(cbr_files: List[Tuple[Union[str, Path], str, bool]], compress: bool,
+                 jobs: Optional[int] = None) -> int:
+    """
+    Convert CBR files to CBZ, in parallel worker processes when useful.
+    
+    Args:
+        cbr_files: CBR files to convert, each with its detected file type and
+            whether it may replace an existing CBZ
+        compress: If True, deflate pages in the CBZ output
+        jobs: Number of worker processes (default: number of CPUs)
+        
+    Returns:
+        Number of files successfully converted
+    """
+    if len(cbr_files) < 2:
+        converted_count = 0
+        for cbr_file, actual_type, replace_existing in cbr_files:
+            if convert_cbr_to_cbz(cbr_file, compress=compress, actual_type=actual_type,
+                                  replace_existing=replace_existing):
+                converted_count += 1
+        return converted_count
+    
+    converted_count = 0
+    # Workers started with 'spawn' (macOS, Windows) do not inherit the
+    # parent's logging setup, so configure it explicitly in each one
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_configure_logging) as executor:
+        futures = [
+            executor.submit(convert_cbr_to_cbz, cbr_file, False, compress, actual_type,
+                            replace_existing)
+            for cbr_file, actual_type, replace_existing in cbr_files
+        ]
+        for future in as_completed(futures):
+            if future.result():
+                converted_count += 1
+    return converted_count
+
+
 if __name__ == '__main__':
     main()
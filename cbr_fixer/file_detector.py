@@ -1,51 +1,169 @@
 """File type detection by reading file headers."""
 
+import atexit
+import json
+import logging
+import os
+import stat
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Set, Union
 
+logger = logging.getLogger(__name__)
 
-def detect_file_type(filepath: Path) -> str:
+# Detected types are cached by file identity so that repeated checks of
+# the same file, within a run or across runs, skip re-reading its header
+_CACHE_FILE = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'cbr-fixer' / 'detect.json'
+
+# Magic numbers as little-endian integers over the first 8 header bytes
+# RAR v1.5: "Rar!\x1a\x07\x00"
+_RAR4_MAGIC = int.from_bytes(b'Rar!\x1a\x07\x00', 'little')
+_RAR4_MASK = (1 << 56) - 1
+# RAR v5.0: "Rar!\x1a\x07\x01\x00"
+_RAR5_MAGIC = int.from_bytes(b'Rar!\x1a\x07\x01\x00', 'little')
+# ZIP: "PK\x03\x04" (local file header) or "PK\x05\x06" (empty archive)
+_ZIP_MAGIC = int.from_bytes(b'PK\x03\x04', 'little')
+_ZIP_EMPTY_MAGIC = int.from_bytes(b'PK\x05\x06', 'little')
+_ZIP_MASK = (1 << 32) - 1
+
+_EXTENSION_TYPES = {'.cbr': 'CBR', '.cbz': 'CBZ'}
+
+_cache: Optional[Dict[str, str]] = None
+_cache_dirty = False
+_cache_lock = threading.Lock()
+# Keys looked up during this run; only these are written back, so
+# entries for files that changed or disappeared are dropped
+_seen_keys: Set[str] = set()
+_cache_persistent = True
+
+
+def set_cache_persistence(enabled: bool):
+    """
+    Enable or disable writing the detection cache to disk at exit.
+    
+    Args:
+        enabled: If False, cached results are only kept in memory
+    """
+    global _cache_persistent
+    _cache_persistent = enabled
+
+
+def detect_file_type(filepath: Union[str, Path]) -> str:
     """
     Detect the actual file type by reading magic bytes.
     
+    Results are cached on (device, inode, mtime, size), so a file is only
+    read again once it has changed.
+    
     Args:
         filepath: Path to the file to check
         
     Returns:
         'CBR' if RAR archive, 'CBZ' if ZIP archive, 'UNKNOWN' otherwise
     """
-    if not filepath.exists() or not filepath.is_file():
+    global _cache_dirty
+    
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return 'UNKNOWN'
+    
+    if not stat.S_ISREG(st.st_mode):
         return 'UNKNOWN'
     
+    key = f"{st.st_dev}:{st.st_ino}:{st.st_mtime_ns}:{st.st_size}"
+    cache = _load_cache()
+    _seen_keys.add(key)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    
+    # Read first 8 bytes to check magic numbers. A raw file descriptor
+    # avoids setting up a buffered reader for such a small read
     try:
-        with open(filepath, 'rb') as f:
-            # Read first 8 bytes to check magic numbers
-            header = f.read(8)
-            
-            if len(header) < 4:
-                return 'UNKNOWN'
-            
-            # Check for RAR format
-            # RAR v1.5: "Rar!\x1a\x07\x00" or "Rar!\x1a\x07\x01\x00"
-            # RAR v5.0: "Rar!\x1a\x07\x01\x00"
-            if header[:4] == b'Rar!' and len(header) >= 7:
-                if header[4:7] == b'\x1a\x07\x00':
-                    return 'CBR'
-                elif len(header) >= 8 and header[4:8] == b'\x1a\x07\x01\x00':
-                    return 'CBR'
-            
-            # Check for ZIP format: "PK\x03\x04" (local file header) or "PK\x05\x06" (empty archive)
-            if header[:2] == b'PK':
-                if len(header) >= 4:
-                    if header[2:4] == b'\x03\x04' or header[2:4] == b'\x05\x06':
-                        return 'CBZ'
-            
-            return 'UNKNOWN'
-    except (IOError, OSError):
+        fd = os.open(filepath, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    except OSError:
+        return 'UNKNOWN'
+    try:
+        header = os.read(fd, 8)
+    except OSError:
+        return 'UNKNOWN'
+    finally:
+        os.close(fd)
+    
+    file_type = _classify_header(header)
+    cache[key] = file_type
+    _cache_dirty = True
+    return file_type
+
+
+def _classify_header(header: bytes) -> str:
+    """
+    Classify a file from its first bytes.
+    
+    Args:
+        header: Up to the first 8 bytes of the file
+        
+    Returns:
+        'CBR' if RAR archive, 'CBZ' if ZIP archive, 'UNKNOWN' otherwise
+    """
+    size = len(header)
+    if size < 4:
         return 'UNKNOWN'
+    
+    # Compare the header as a single little-endian integer, masking off
+    # the bytes each signature does not cover. Length checks keep the
+    # zero padding of short files from matching a longer signature
+    value = int.from_bytes(header, 'little')
+    
+    if size >= 7 and value & _RAR4_MASK == _RAR4_MAGIC:
+        return 'CBR'
+    if size >= 8 and value == _RAR5_MAGIC:
+        return 'CBR'
+    
+    zip_magic = value & _ZIP_MASK
+    if zip_magic == _ZIP_MAGIC or zip_magic == _ZIP_EMPTY_MAGIC:
+        return 'CBZ'
+    
+    return 'UNKNOWN'
+
 
+def _load_cache() -> Dict[str, str]:
+    """Load the persistent detection cache on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    with open(_CACHE_FILE, 'r', encoding='utf-8') as f:
+                        loaded = json.load(f)
+                    _cache = loaded if isinstance(loaded, dict) else {}
+                except (IOError, OSError, ValueError):
+                    _cache = {}
+                atexit.register(_save_cache)
+    return _cache
 
-def get_expected_type_from_extension(filepath: Path) -> Optional[str]:
+
+def _save_cache():
+    """Write the entries used in this run back to disk if anything changed."""
+    if not _cache_persistent or _cache is None:
+        return
+    
+    entries = {key: _cache[key] for key in _seen_keys if key in _cache}
+    if not _cache_dirty and len(entries) == len(_cache):
+        return
+    
+    try:
+        _CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = _CACHE_FILE.with_name(f"{_CACHE_FILE.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, _CACHE_FILE)
+    except (IOError, OSError) as e:
+        logger.debug(f"Could not write detection cache {_CACHE_FILE}: {e}")
+
+
+def get_expected_type_from_extension(filepath: Union[str, Path]) -> Optional[str]:
     """
     Get expected file type from extension.
     
@@ -55,9 +173,9 @@ def get_expected_type_from_extension(filepath: Path) -> Optional[str]:
     Returns:
         'CBR' if .cbr extension, 'CBZ' if .cbz extension, None otherwise
     """
-    ext = filepath.suffix.lower()
-    if ext == '.cbr':
-        return 'CBR'
-    elif ext == '.cbz':
-        return 'CBZ'
-    return None
+    # Both extensions are 4 characters, so slicing the name avoids
+    # computing Path.suffix. A file named just ".cbr" has no extension
+    name = os.path.basename(os.fspath(filepath))
+    if len(name) <= 4:
+        return None
+    return _EXTENSION_TYPES.get(name[-4:].lower())
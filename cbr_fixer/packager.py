@@ -1,19 +1,17 @@
-"""Package image sequences into CBR files."""
+"""Package image sequences into CBZ files."""
 
 import logging
-import re
-import shutil
-import subprocess
-import tempfile
+import zipfile
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Union
 
+from ._patterns import IMAGE_SEQUENCE_RE
 from .utils import log_operation
 
 logger = logging.getLogger(__name__)
 
 
-def detect_image_sequence(directory: Path) -> Optional[List[Path]]:
+def detect_image_sequence(directory: Union[str, Path]) -> Optional[List[Path]]:
     """
     Detect if directory contains sequentially numbered images.
     
@@ -23,21 +21,16 @@ def detect_image_sequence(directory: Path) -> Optional[List[Path]]:
     Returns:
         List of image file paths in numerical order, or None if not a sequence
     """
+    directory = Path(directory)
     if not directory.exists() or not directory.is_dir():
         return None
     
-    # Pattern for sequentially numbered images
-    pattern = re.compile(r'^0*(\d+)\.(jpg|jpeg|png|gif|bmp|webp)$', re.IGNORECASE)
-    
     image_files = []
     
     try:
         for item in directory.iterdir():
-            if item.is_file() and pattern.match(item.name):
-                match = pattern.match(item.name)
-                if match:
-                    number = int(match.group(1))
-                    image_files.append((number, item))
+            if item.is_file() and (match := IMAGE_SEQUENCE_RE.fullmatch(item.name)) is not None:
+                image_files.append((int(match.group(1)), item))
     except (PermissionError, OSError) as e:
         logger.warning(f"Error reading directory {directory}: {e}")
         return None
@@ -61,11 +54,8 @@ def detect_image_sequence(directory: Path) -> Optional[List[Path]]:
         else:
             consecutive_count = 0
     
-    min_num = min(numbers)
-    max_num = max(numbers)
-    expected_range = set(range(min_num, max_num + 1))
-    actual_numbers = set(numbers)
-    coverage = len(expected_range & actual_numbers) / len(expected_range) if expected_range else 0
+    # Numbers are sorted, so the range spans first to last
+    coverage = len(set(numbers)) / (numbers[-1] - numbers[0] + 1)
     
     if max_consecutive >= 2 or coverage > 0.8:
         return [path for _, path in image_files]
@@ -73,82 +63,54 @@ def detect_image_sequence(directory: Path) -> Optional[List[Path]]:
     return None
 
 
-def package_to_cbr(directory: Path, dry_run: bool = False) -> Optional[Path]:
+def package_to_cbz(directory: Union[str, Path], dry_run: bool = False) -> Optional[Path]:
     """
-    Package a directory of sequentially numbered images into a CBR file.
+    Package a directory of sequentially numbered images into a CBZ file.
+    
+    Images are written in-process to a ZIP archive with no compression,
+    since page images are already compressed.
     
     Args:
         directory: Directory containing image sequence
         dry_run: If True, only log what would be done
         
     Returns:
-        Path to the created CBR file, or None on error
+        Path to the created CBZ file, or None on error
     """
+    directory = Path(directory)
     image_files = detect_image_sequence(directory)
     if not image_files:
         logger.warning(f"Directory {directory} does not contain a valid image sequence")
         return None
     
-    # Create CBR filename based on directory name
-    cbr_filename = f"{directory.name}.cbr"
-    cbr_path = directory.parent / cbr_filename
+    # Create CBZ filename based on directory name
+    cbz_filename = f"{directory.name}.cbz"
+    cbz_path = directory.parent / cbz_filename
     
     # If file already exists, add a suffix
     counter = 1
-    original_path = cbr_path
-    while cbr_path.exists():
-        cbr_path = original_path.parent / f"{directory.name}_{counter}.cbr"
+    original_path = cbz_path
+    while cbz_path.exists():
+        cbz_path = original_path.parent / f"{directory.name}_{counter}.cbz"
         counter += 1
     
     if dry_run:
-        log_operation(f"Would package image sequence from {directory} -> {cbr_path}", dry_run=True)
+        log_operation(f"Would package image sequence from {directory} -> {cbz_path}", dry_run=True)
         log_operation(f"  Would include {len(image_files)} images", dry_run=True)
-        return cbr_path
+        return cbz_path
     
     try:
-        # Create RAR archive using rar command or unrar
-        # Since rarfile doesn't support creating RAR files, we use subprocess
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmpdir_path = Path(tmpdir)
-            
-            # Copy images to temp directory (maintaining order)
+        # Images are already in numerical order
+        with zipfile.ZipFile(cbz_path, 'w', zipfile.ZIP_STORED, strict_timestamps=False) as zf:
             for img_path in image_files:
-                shutil.copy2(img_path, tmpdir_path / img_path.name)
-            
-            # Try to use 'rar' command first
-            # Use shell=True on Windows, but prefer explicit file list on Unix
-            try:
-                # Find rar command in PATH
-                rar_cmd_path = shutil.which('rar')
-                if not rar_cmd_path:
-                    raise FileNotFoundError("rar command not found in PATH")
-                
-                # Build command with explicit file list for better cross-platform support
-                rar_cmd = [rar_cmd_path, 'a', '-ep1', str(cbr_path)]
-                # Add all image files explicitly
-                for img_file in sorted(tmpdir_path.iterdir()):
-                    if img_file.is_file():
-                        rar_cmd.append(str(img_file))
-                
-                result = subprocess.run(
-                    rar_cmd,
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
-            except FileNotFoundError as e:
-                logger.error(f"'rar' command not found: {e}")
-                logger.error("Please install RAR (rar command) to create CBR files.")
-                logger.error("On macOS: brew install rar")
-                logger.error("On Linux: apt-get install rar or yum install rar")
-                return None
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Error running rar command: {e}")
-                logger.error(f"rar stderr: {e.stderr}")
-                return None
+                zf.write(img_path, arcname=img_path.name)
         
-        log_operation(f"Packaged image sequence: {directory} -> {cbr_path} ({len(image_files)} images)", dry_run=False)
-        return cbr_path
+        log_operation(f"Packaged image sequence: {directory} -> {cbz_path} ({len(image_files)} images)", dry_run=False)
+        return cbz_path
     except Exception as e:
-        logger.error(f"Error packaging {directory} to CBR: {e}")
+        logger.error(f"Error packaging {directory} to CBZ: {e}")
+        try:
+            cbz_path.unlink()
+        except OSError:
+            pass
         return None
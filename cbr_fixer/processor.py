@@ -1,11 +1,12 @@
 """File processing: fix extensions and convert CBR to CBZ."""
 
 import logging
+import os
 import shutil
-import tempfile
+import subprocess
 import zipfile
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Union
 
 import rarfile
 
@@ -14,23 +15,30 @@ from .utils import log_operation
 
 logger = logging.getLogger(__name__)
 
+# Chunk size used when streaming archive members
+COPY_BUFFER_SIZE = 1024 * 1024
 
-def fix_extension(filepath: Path, dry_run: bool = False) -> Optional[Path]:
+
+def fix_extension(filepath: Union[str, Path], dry_run: bool = False,
+                  actual_type: Optional[str] = None) -> Optional[Path]:
     """
     Fix file extension if it doesn't match the actual file type.
     
     Args:
         filepath: Path to the file to check and fix
         dry_run: If True, only log what would be done
+        actual_type: Already detected file type, to skip reading the header again
         
     Returns:
         Path to the new file with corrected extension, or None if no fix needed or error
     """
+    filepath = Path(filepath)
     expected_type = get_expected_type_from_extension(filepath)
     if expected_type is None:
         return None
     
-    actual_type = detect_file_type(filepath)
+    if actual_type is None:
+        actual_type = detect_file_type(filepath)
     
     if actual_type == 'UNKNOWN':
         logger.warning(f"Could not determine file type for: {filepath}")
@@ -51,12 +59,28 @@ def fix_extension(filepath: Path, dry_run: bool = False) -> Optional[Path]:
     # Create new filename with correct extension
     new_path = filepath.with_suffix(new_extension)
     
+    # Never overwrite a different file that already has the target name;
+    # a link to the same file is what a previous run left behind
+    already_linked = _same_file(new_path, filepath)
+    if new_path.exists() and not already_linked:
+        logger.warning(f"Not fixing extension for {filepath}: {new_path} already exists")
+        return None
+    
     if dry_run:
         log_operation(f"Would fix extension: {filepath} -> {new_path} (actual type: {actual_type})", dry_run=True)
         return new_path
     
     try:
-        shutil.copy2(filepath, new_path)
+        # Hard-link the original under its corrected name: no bytes are
+        # copied and the original file is left untouched. Fall back to
+        # a full copy where links are unsupported (e.g. across devices)
+        if not already_linked:
+            try:
+                os.link(filepath, new_path)
+            except FileExistsError:
+                raise
+            except OSError:
+                shutil.copy2(filepath, new_path)
         log_operation(f"Fixed extension: {filepath} -> {new_path} (actual type: {actual_type})", dry_run=False)
         return new_path
     except (IOError, OSError) as e:
@@ -64,60 +88,189 @@ def fix_extension(filepath: Path, dry_run: bool = False) -> Optional[Path]:
         return None
 
 
-def convert_cbr_to_cbz(cbr_path: Path, dry_run: bool = False) -> Optional[Path]:
+def convert_cbr_to_cbz(cbr_path: Union[str, Path], dry_run: bool = False, compress: bool = False,
+                       actual_type: Optional[str] = None,
+                       replace_existing: bool = False) -> Optional[Path]:
     """
     Convert a CBR (RAR) file to CBZ (ZIP) format.
     
+    Pages are stored uncompressed by default: comic images are already
+    compressed, so deflating them costs CPU for almost no size gain.
+    
     Args:
         cbr_path: Path to the CBR file
         dry_run: If True, only log what would be done
+        compress: If True, deflate members instead of storing them
+        actual_type: Already detected file type, to skip reading the header again
+        replace_existing: If True, the CBZ path holds the mislabeled original
+            this CBR was fixed from, and is replaced by the converted file
         
     Returns:
         Path to the new CBZ file, or None on error
     """
+    cbr_path = Path(cbr_path)
     if not cbr_path.exists():
         logger.error(f"CBR file not found: {cbr_path}")
         return None
     
     # Verify it's actually a RAR file
-    actual_type = detect_file_type(cbr_path)
+    if actual_type is None:
+        actual_type = detect_file_type(cbr_path)
     if actual_type != 'CBR':
         logger.warning(f"File {cbr_path} is not a valid CBR (RAR) file, actual type: {actual_type}")
         return None
     
     cbz_path = cbr_path.with_suffix('.cbz')
     
+    # An existing CBZ is only replaced when the caller says it is the
+    # mislabeled original cbr_path was fixed from; anything else is kept
+    if cbz_path.exists() and not replace_existing:
+        logger.info(f"Skipping conversion of {cbr_path}: {cbz_path} already exists")
+        return None
+    
     if dry_run:
         log_operation(f"Would convert CBR to CBZ: {cbr_path} -> {cbz_path}", dry_run=True)
         return cbz_path
     
+    # Write under a temporary name and move it into place once complete.
+    # The target may be a hard link to cbr_path (see fix_extension), so
+    # opening it for writing directly would truncate the source as well
+    part_path = cbz_path.with_name(f"{cbz_path.name}.part")
+    
     try:
-        # Extract RAR contents to temporary directory
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmpdir_path = Path(tmpdir)
-            
-            # Extract RAR archive
+        # Stream each RAR member straight into the ZIP archive, without
+        # extracting to a temporary directory first
+        with rarfile.RarFile(cbr_path) as rf:
+            members = [info for info in rf.infolist() if not info.is_dir()]
             try:
-                with rarfile.RarFile(cbr_path) as rf:
-                    rf.extractall(tmpdir_path)
-            except rarfile.RarCannotExec:
-                logger.error(f"Cannot extract RAR file. Make sure 'unrar' is installed and in PATH.")
-                return None
-            except Exception as e:
-                logger.error(f"Error extracting RAR file {cbr_path}: {e}")
-                return None
-            
-            # Create ZIP archive from extracted files
-            with zipfile.ZipFile(cbz_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                # Get all files from temp directory, maintaining directory structure
-                for file_path in sorted(tmpdir_path.rglob('*')):
-                    if file_path.is_file():
-                        # Use relative path from temp directory root
-                        arcname = file_path.relative_to(tmpdir_path)
-                        zf.write(file_path, arcname)
+                compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+                with zipfile.ZipFile(part_path, 'w', compression, strict_timestamps=False) as zf:
+                    _copy_rar_members(rf, cbr_path, members, zf)
+            except Exception:
+                _remove_partial(part_path)
+                raise
         
+        os.replace(part_path, cbz_path)
         log_operation(f"Converted CBR to CBZ: {cbr_path} -> {cbz_path}", dry_run=False)
         return cbz_path
+    except rarfile.RarCannotExec:
+        logger.error(f"Cannot extract RAR file. Make sure 'unrar' is installed and in PATH.")
+        return None
     except Exception as e:
         logger.error(f"Error converting {cbr_path} to CBZ: {e}")
         return None
+
+
+def _copy_rar_members(rf: rarfile.RarFile, cbr_path: Path, members: List[rarfile.RarInfo],
+                      zf: zipfile.ZipFile):
+    """
+    Copy RAR members into an open ZIP archive, sorted by name.
+    
+    Some readers show pages in archive order, so the ZIP is always written
+    sorted. When the RAR has compressed members, is already stored in that
+    order and the unrar tool is available, a single 'unrar p' process
+    streams every member instead of rarfile starting one process per
+    compressed member. Archives with only stored members are read directly
+    by rarfile without any process; those that are unsorted, need a
+    password or contain links also use rarfile's per-member reader.
+    
+    Args:
+        rf: Open RAR archive
+        cbr_path: Path to the RAR archive
+        members: Non-directory members to copy, in archive order
+        zf: ZIP archive open for writing
+    """
+    names = [info.filename for info in members]
+    if (any(info.compress_type != rarfile.RAR_M0 for info in members)
+            and names == sorted(names) and not rf.needs_password()
+            and all(info.is_file() for info in members)):
+        unrar = shutil.which(rarfile.UNRAR_TOOL)
+        if unrar:
+            _copy_rar_members_piped(unrar, cbr_path, members, zf)
+            return
+    
+    for info in sorted(members, key=lambda i: i.filename):
+        with rf.open(info) as src, _open_zip_member(zf, info) as dst:
+            shutil.copyfileobj(src, dst, length=COPY_BUFFER_SIZE)
+
+
+def _copy_rar_members_piped(unrar: str, cbr_path: Path, members: List[rarfile.RarInfo],
+                            zf: zipfile.ZipFile):
+    """
+    Copy RAR members into a ZIP archive from one 'unrar p' pipe.
+    
+    unrar prints all members back to back in archive order, so the sizes
+    from the RAR headers are used to split the stream.
+    
+    Args:
+        unrar: Path to the unrar executable
+        cbr_path: Path to the RAR archive
+        members: Non-directory members to copy, in archive order
+        zf: ZIP archive open for writing
+    """
+    cmd = [unrar, 'p', '-inul', '-p-', '-y', str(cbr_path)]
+    with subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE) as proc:
+        try:
+            for info in members:
+                with _open_zip_member(zf, info) as dst:
+                    _copy_exact(proc.stdout, dst, info.file_size)
+            if proc.stdout.read(1):
+                raise IOError("unrar produced more data than the archive headers describe")
+        except BaseException:
+            proc.kill()
+            raise
+    
+    if proc.returncode != 0:
+        raise IOError(f"unrar exited with status {proc.returncode}")
+
+
+def _open_zip_member(zf: zipfile.ZipFile, info: rarfile.RarInfo):
+    """
+    Open a ZIP member for writing that mirrors a RAR member.
+    
+    The ZipInfo is filled from the RAR header, so nothing is stat'ed, and
+    the known size lets zipfile only use ZIP64 records when needed.
+    """
+    zip_info = zipfile.ZipInfo(info.filename, date_time=_zip_date_time(info.date_time))
+    zip_info.file_size = info.file_size
+    zip_info.compress_type = zf.compression
+    return zf.open(zip_info, 'w')
+
+
+def _zip_date_time(date_time) -> tuple:
+    """Clamp a RAR timestamp to the range a ZIP header can store."""
+    if not date_time:
+        return (1980, 1, 1, 0, 0, 0)
+    date_time = tuple(int(v) for v in date_time[:6])
+    if date_time[0] < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    if date_time[0] > 2107:
+        return (2107, 12, 31, 23, 59, 59)
+    return date_time
+
+
+def _copy_exact(src, dst, size: int):
+    """Copy exactly size bytes from src to dst."""
+    remaining = size
+    while remaining:
+        chunk = src.read(min(COPY_BUFFER_SIZE, remaining))
+        if not chunk:
+            raise IOError("Unexpected end of unrar output")
+        dst.write(chunk)
+        remaining -= len(chunk)
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    """Return True if both paths exist and refer to the same file."""
+    try:
+        return a.samefile(b)
+    except OSError:
+        return False
+
+
+def _remove_partial(path: Path):
+    """Remove an incomplete output file left behind by a failed conversion."""
+    try:
+        path.unlink()
+    except OSError:
+        pass
@@ -1,19 +1,24 @@
 """Directory scanning and file discovery."""
 
-import re
+import os
 from pathlib import Path
-from typing import List, Dict, Set
+from typing import List, Set
 
-from .file_detector import get_expected_type_from_extension
+from ._patterns import IMAGE_SEQUENCE_RE
 
 
 class ScanResult:
-    """Container for scan results."""
+    """
+    Container for scan results.
+    
+    Paths are kept as the plain strings os.scandir yields; consumers turn
+    them into Path objects only when they need one.
+    """
     
     def __init__(self):
-        self.cbr_files: List[Path] = []
-        self.cbz_files: List[Path] = []
-        self.image_sequence_dirs: List[Path] = []
+        self.cbr_files: List[str] = []
+        self.cbz_files: List[str] = []
+        self.image_sequence_dirs: List[str] = []
     
     def __repr__(self):
         return (f"ScanResult(cbr_files={len(self.cbr_files)}, "
@@ -25,6 +30,10 @@ def scan_directory(directory: Path, recursive: bool = True) -> ScanResult:
     """
     Scan directory for CBR/CBZ files and image sequences.
     
+    Each directory is listed exactly once: a single pass over its entries
+    collects archives, image sequence numbers and subdirectories to visit.
+    Subdirectories of an image sequence directory are not scanned.
+    
     Args:
         directory: Directory to scan
         recursive: If True, scan subdirectories
@@ -37,58 +46,83 @@ def scan_directory(directory: Path, recursive: bool = True) -> ScanResult:
     if not directory.exists() or not directory.is_dir():
         return result
     
-    # Pattern for sequentially numbered images (001.jpg, 002.png, etc.)
-    image_pattern = re.compile(r'^0*(\d+)\.(jpg|jpeg|png|gif|bmp|webp)$', re.IGNORECASE)
+    # Stack of (path, depth, descend); the top-level directory itself is
+    # never reported as an image sequence, only its subdirectories are
+    stack = [(str(directory), 0, True)]
     
-    if recursive:
-        iterator = directory.rglob('*')
-    else:
-        iterator = directory.iterdir()
-    
-    for item in iterator:
-        if item.is_file():
-            ext = item.suffix.lower()
-            if ext == '.cbr':
-                result.cbr_files.append(item)
-            elif ext == '.cbz':
-                result.cbz_files.append(item)
-        elif item.is_dir():
-            # Check if directory contains sequentially numbered images
-            if _is_image_sequence_directory(item, image_pattern):
-                result.image_sequence_dirs.append(item)
+    while stack:
+        path, depth, descend = stack.pop()
+        
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except (PermissionError, OSError):
+            continue
+        
+        # In non-recursive mode, direct subdirectories are still listed to
+        # detect image sequences, but their archives are not collected.
+        # Symlinked directories (descend is False) are likewise only
+        # checked for a sequence, so their targets are never written to
+        collect_archives = descend and (recursive or depth == 0)
+        numbers: Set[int] = set()
+        # Set once three consecutive numbers are seen, which settles the
+        # sequence check without parsing the remaining filenames
+        is_sequence = False
+        subdirs = []
+        
+        for entry in entries:
+            if entry.is_file():
+                # Only lowercase the 4-character suffix, not the whole name.
+                # A file named just ".cbr" has no extension (as Path.suffix)
+                name = entry.name
+                suffix = name[-4:].lower() if len(name) > 4 else ''
+                if suffix == '.cbr':
+                    if collect_archives:
+                        result.cbr_files.append(entry.path)
+                elif suffix == '.cbz':
+                    if collect_archives:
+                        result.cbz_files.append(entry.path)
+                elif (depth > 0 and not is_sequence
+                      and (match := IMAGE_SEQUENCE_RE.fullmatch(entry.name)) is not None):
+                    number = int(match.group(1))
+                    numbers.add(number)
+                    is_sequence = (
+                        {number - 1, number + 1} <= numbers
+                        or {number - 2, number - 1} <= numbers
+                        or {number + 1, number + 2} <= numbers
+                    )
+            elif entry.is_dir():
+                if descend and (recursive or depth == 0):
+                    # Symlinked directories are checked but not scanned further
+                    subdirs.append((entry.path, not entry.is_symlink()))
+        
+        if is_sequence or (depth > 0 and _is_image_sequence(numbers)):
+            result.image_sequence_dirs.append(path)
+            # A page folder is a leaf: do not descend into its subdirectories
+            continue
+        
+        # Push in reverse so subdirectories are visited in listing order
+        for subdir, is_real_dir in reversed(subdirs):
+            stack.append((subdir, depth + 1, is_real_dir))
     
     return result
 
 
-def _is_image_sequence_directory(directory: Path, pattern: re.Pattern) -> bool:
+def _is_image_sequence(numbers: Set[int]) -> bool:
     """
-    Check if directory contains sequentially numbered images.
+    Check if image numbers found in a directory form a sequence.
     
     Args:
-        directory: Directory to check
-        pattern: Compiled regex pattern for image files
+        numbers: Numbers parsed from the directory's image filenames
         
     Returns:
-        True if directory appears to contain an image sequence
+        True if the numbers appear to form an image sequence
     """
-    image_files = []
-    
-    try:
-        for item in directory.iterdir():
-            if item.is_file() and pattern.match(item.name):
-                match = pattern.match(item.name)
-                if match:
-                    number = int(match.group(1))
-                    image_files.append((number, item))
-    except (PermissionError, OSError):
-        return False
-    
-    if len(image_files) < 2:  # Need at least 2 images to be a sequence
+    if len(numbers) < 2:  # Need at least 2 images to be a sequence
         return False
     
     # Check if numbers are sequential
-    image_files.sort(key=lambda x: x[0])
-    numbers = [num for num, _ in image_files]
+    numbers = sorted(numbers)
     
     # Check if numbers form a sequence (allowing some gaps)
     # We'll be lenient - if we have at least 3 consecutive numbers, it's a sequence
@@ -104,7 +138,8 @@ def _is_image_sequence_directory(directory: Path, pattern: re.Pattern) -> bool:
     
     # Consider it a sequence if we have at least 3 consecutive numbers
     # or if numbers are mostly sequential (80% of numbers are in sequence)
-    if max_consecutive >= 2 or len(set(range(min(numbers), max(numbers) + 1)) & set(numbers)) / len(range(min(numbers), max(numbers) + 1)) > 0.8:
+    coverage = len(set(numbers)) / (numbers[-1] - numbers[0] + 1)
+    if max_consecutive >= 2 or coverage > 0.8:
         return True
     
     return False
@@ -2,11 +2,15 @@
 
 import logging
 import shutil
+import zipfile
 from pathlib import Path
 from typing import List
 
 logger = logging.getLogger(__name__)
 
+# I/O buffer size used when writing archives
+ARCHIVE_WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+
 
 def safe_copy(src: Path, dst: Path, dry_run: bool = False) -> bool:
     """
@@ -37,62 +41,40 @@ def safe_create_archive(files: List[Path], archive_path: Path, archive_type: str
     """
     Create an archive with dry-run support.
     
+    Archives are always written as uncompressed ZIP files. RAR cannot be
+    created in-process, so a 'CBR' request produces ZIP data as well,
+    which comic readers accept regardless of extension.
+    
     Args:
         files: List of file paths to include in archive
         archive_path: Path for the output archive
-        archive_type: 'CBR' (RAR) or 'CBZ' (ZIP)
+        archive_type: 'CBR' or 'CBZ'
         dry_run: If True, only log what would be done
         
     Returns:
         True if successful (or dry-run), False on error
     """
+    if archive_type not in ('CBR', 'CBZ'):
+        logger.error(f"Unknown archive type: {archive_type}")
+        return False
+    
     if dry_run:
         logger.info(f"[DRY RUN] Would create {archive_type} archive: {archive_path}")
         for f in files:
             logger.info(f"  [DRY RUN] Would add: {f}")
         return True
     
+    if archive_type == 'CBR':
+        logger.warning(f"Writing {archive_path} as a ZIP archive; RAR creation is not supported")
+    
     try:
-        if archive_type == 'CBZ':
-            import zipfile
-            with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for file_path in files:
-                    zf.write(file_path, file_path.name)
-            logger.info(f"Created CBZ archive: {archive_path}")
-            return True
-        elif archive_type == 'CBR':
-            import rarfile
-            # Note: rarfile doesn't support creating RAR files directly
-            # We'll need to use a different approach - call unrar command or use patoolib
-            # For now, we'll use a workaround with patoolib or subprocess
-            import subprocess
-            import tempfile
-            
-            # Create a temporary directory and copy files there
-            with tempfile.TemporaryDirectory() as tmpdir:
-                tmpdir_path = Path(tmpdir)
-                for file_path in files:
-                    shutil.copy2(file_path, tmpdir_path / file_path.name)
-                
-                # Use rar command if available, otherwise try unrar
-                # This is a simplified approach - in production you might want to use patoolib
-                try:
-                    subprocess.run(
-                        ['rar', 'a', '-ep1', str(archive_path), str(tmpdir_path / '*')],
-                        check=True,
-                        capture_output=True
-                    )
-                except (subprocess.CalledProcessError, FileNotFoundError):
-                    # Try unrar or alternative method
-                    logger.warning(f"rar command not found, trying alternative method")
-                    # Fallback: we could use patoolib here
-                    raise NotImplementedError("RAR creation requires 'rar' command or patoolib")
-            
-            logger.info(f"Created CBR archive: {archive_path}")
-            return True
-        else:
-            logger.error(f"Unknown archive type: {archive_type}")
-            return False
+        # A large write buffer keeps the number of write syscalls low
+        with open(archive_path, 'wb', buffering=ARCHIVE_WRITE_BUFFER_SIZE) as fh, \
+                zipfile.ZipFile(fh, 'w', zipfile.ZIP_STORED, strict_timestamps=False) as zf:
+            for file_path in files:
+                zf.write(file_path, file_path.name)
+        logger.info(f"Created {archive_type} archive: {archive_path}")
+        return True
     except Exception as e:
         logger.error(f"Error creating {archive_type} archive {archive_path}: {e}")
         return False
@@ -0,0 +1,180 @@
+"""Tests for file type detection."""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from cbr_fixer import file_detector
+from cbr_fixer.file_detector import (
+    detect_file_type, get_expected_type_from_extension, set_cache_persistence,
+)
+
+RAR4 = b'Rar!\x1a\x07\x00' + b'\x00' * 16
+ZIP = b'PK\x03\x04' + b'\x00' * 16
+
+
+@pytest.fixture
+def cache_file(tmp_path, monkeypatch):
+    """Point the detection cache at a temporary file and reset its state."""
+    path = tmp_path / 'cache' / 'detect.json'
+    monkeypatch.setattr(file_detector, '_CACHE_FILE', path)
+    monkeypatch.setattr(file_detector, '_cache', None)
+    monkeypatch.setattr(file_detector, '_cache_dirty', False)
+    monkeypatch.setattr(file_detector, '_seen_keys', set())
+    monkeypatch.setattr(file_detector, '_cache_persistent', True)
+    # Saving is driven by the tests; nothing may be written at exit
+    monkeypatch.setattr(file_detector.atexit, 'register', lambda func: func)
+    return path
+
+
+@pytest.fixture
+def header_reads(monkeypatch):
+    """Count the files detect_file_type opens to read a header."""
+    opened = []
+    real_open = os.open
+
+    def counting_open(path, flags, *args):
+        opened.append(Path(path).name)
+        return real_open(path, flags, *args)
+
+    monkeypatch.setattr(file_detector.os, 'open', counting_open)
+    return opened
+
+
+def _reload_cache():
+    file_detector._cache = None
+    file_detector._cache_dirty = False
+    file_detector._seen_keys = set()
+
+
+@pytest.mark.parametrize('header, expected', [
+    (b'Rar!\x1a\x07\x00', 'CBR'),                # RAR4, exactly 7 bytes
+    (b'Rar!\x1a\x07\x00\xcf', 'CBR'),            # RAR4 with following data
+    (b'Rar!\x1a\x07\x01\x00', 'CBR'),            # RAR5
+    (b'Rar!\x1a\x07\x01', 'UNKNOWN'),            # truncated RAR5 prefix
+    (b'Rar!\x1a\x07\x01\x01', 'UNKNOWN'),        # RAR5 prefix, wrong last byte
+    (b'Rar!\x1a\x07', 'UNKNOWN'),                # truncated RAR signature
+    (b'Rar!\x1a\x08\x00\x00', 'UNKNOWN'),        # wrong RAR version byte
+    (b'PK\x03\x04', 'CBZ'),                      # ZIP, exactly 4 bytes
+    (b'PK\x03\x04\x14\x00\x00\x00', 'CBZ'),      # ZIP local file header
+    (b'PK\x05\x06\x00\x00\x00\x00', 'CBZ'),      # empty ZIP
+    (b'PK\x03', 'UNKNOWN'),                      # truncated ZIP signature
+    (b'PK\x07\x08\x00\x00\x00\x00', 'UNKNOWN'),  # ZIP spanning marker
+    (b'\x00PK\x03\x04\x00\x00\x00', 'UNKNOWN'),  # signature not at start
+    (b'\xff\xd8\xff\xe0\x00\x10JF', 'UNKNOWN'),  # JPEG
+    (b'', 'UNKNOWN'),                            # empty file
+])
+def test_classify_header(header, expected):
+    assert file_detector._classify_header(header) == expected
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('book.cbr', 'CBR'),
+    (Path('dir') / 'Book.CBZ', 'CBZ'),
+    ('book.zip', None),
+    ('cbr', None),
+    ('.cbr', None),
+    (Path('dir') / '.cbz', None),
+])
+def test_expected_type_from_extension(path, expected):
+    assert get_expected_type_from_extension(path) == expected
+
+
+def test_cache_hit_skips_header_read(tmp_path, cache_file, header_reads):
+    book = tmp_path / 'book.cbz'
+    book.write_bytes(RAR4)
+
+    assert detect_file_type(book) == 'CBR'
+    assert detect_file_type(str(book)) == 'CBR'
+    assert header_reads == ['book.cbz']
+
+
+def test_changed_mtime_misses_cache(tmp_path, cache_file, header_reads):
+    book = tmp_path / 'book.cbz'
+    book.write_bytes(RAR4)
+    assert detect_file_type(book) == 'CBR'
+
+    # Same size, different content and modification time
+    book.write_bytes(ZIP[:len(RAR4)])
+    st = book.stat()
+    os.utime(book, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    assert detect_file_type(book) == 'CBZ'
+    assert header_reads == ['book.cbz', 'book.cbz']
+
+
+def test_changed_size_misses_cache(tmp_path, cache_file, header_reads):
+    book = tmp_path / 'book.cbz'
+    book.write_bytes(RAR4)
+    st = book.stat()
+    assert detect_file_type(book) == 'CBR'
+
+    # Different size, modification time restored
+    book.write_bytes(ZIP)
+    os.utime(book, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    assert detect_file_type(book) == 'CBZ'
+    assert header_reads == ['book.cbz', 'book.cbz']
+
+
+def test_non_regular_files_are_unknown(tmp_path, cache_file, header_reads):
+    (tmp_path / 'dir.cbr').mkdir()
+
+    assert detect_file_type(tmp_path / 'dir.cbr') == 'UNKNOWN'
+    assert detect_file_type(tmp_path / 'missing.cbr') == 'UNKNOWN'
+    assert header_reads == []
+
+
+def test_cache_persists_across_runs(tmp_path, cache_file, header_reads):
+    book = tmp_path / 'book.cbr'
+    book.write_bytes(RAR4)
+    assert detect_file_type(book) == 'CBR'
+    file_detector._save_cache()
+
+    _reload_cache()
+
+    assert detect_file_type(book) == 'CBR'
+    assert header_reads == ['book.cbr']
+
+
+def test_disabled_persistence_writes_nothing(tmp_path, cache_file):
+    book = tmp_path / 'book.cbr'
+    book.write_bytes(RAR4)
+    set_cache_persistence(False)
+
+    assert detect_file_type(book) == 'CBR'
+    file_detector._save_cache()
+
+    assert not cache_file.exists()
+
+
+def test_save_keeps_only_entries_seen_this_run(tmp_path, cache_file):
+    cache_file.parent.mkdir()
+    cache_file.write_text(json.dumps({'0:0:0:1': 'CBR', '0:0:0:2': 'CBZ'}))
+    book = tmp_path / 'book.cbz'
+    book.write_bytes(ZIP)
+    st = book.stat()
+
+    assert detect_file_type(book) == 'CBZ'
+    file_detector._save_cache()
+
+    key = f"{st.st_dev}:{st.st_ino}:{st.st_mtime_ns}:{st.st_size}"
+    assert json.loads(cache_file.read_text()) == {key: 'CBZ'}
+
+
+def test_save_prunes_stale_entries_without_new_lookups(tmp_path, cache_file):
+    book = tmp_path / 'book.cbz'
+    book.write_bytes(ZIP)
+    detect_file_type(book)
+    file_detector._save_cache()
+    saved = json.loads(cache_file.read_text())
+
+    # Next run only hits the cache, but the stale entry must still go
+    cache_file.write_text(json.dumps({**saved, '0:0:0:1': 'CBR'}))
+    _reload_cache()
+    detect_file_type(book)
+    file_detector._save_cache()
+
+    assert json.loads(cache_file.read_text()) == saved
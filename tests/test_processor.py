@@ -0,0 +1,207 @@
+"""Tests for CBR to CBZ conversion."""
+
+import os
+import struct
+import sys
+import zipfile
+import zlib
+
+import pytest
+import rarfile
+
+from cbr_fixer import processor
+from cbr_fixer.processor import convert_cbr_to_cbz
+
+
+def _rar_block(head_type, flags, body):
+    data = struct.pack('<BHH', head_type, flags, 7 + len(body)) + body
+    return struct.pack('<H', zlib.crc32(data) & 0xFFFF) + data
+
+
+def build_rar(members, method=0x30):
+    """
+    Build a RAR4 archive from (name, data) pairs.
+
+    Member data is always written as is; with a method other than stored
+    (0x30) only the header claims it is compressed, which fake_unrar
+    below knows to undo.
+    """
+    out = b'Rar!\x1a\x07\x00' + _rar_block(0x73, 0, b'\x00' * 6)
+    for name, data in members:
+        fname = name.encode()
+        body = struct.pack('<IIBIIBBHI', len(data), len(data), 3, zlib.crc32(data),
+                           0x5A210000, 20, method, len(fname), 0o100644 << 16) + fname
+        out += _rar_block(0x74, 0x8000, body) + data
+    return out + _rar_block(0x7B, 0, b'')
+
+
+FAKE_UNRAR = """\
+import sys
+import rarfile
+
+args = sys.argv[1:]
+with open({log!r}, 'a') as log:
+    log.write(' '.join(args) + '\\n')
+if '-?' in args:
+    sys.exit(0)
+output = {output!r}
+if output is None:
+    # 'p' prints the named members, or all of them, from archives made by
+    # build_rar, whose "compressed" data is really stored as is
+    archive, *names = [arg for arg in args[1:] if not arg.startswith('-')]
+    with open(archive, 'rb') as f:
+        data = f.read()
+    output = b''.join(
+        data[info.data_offset:info.data_offset + info.compress_size]
+        for info in rarfile.RarFile(archive).infolist()
+        if not names or info.filename in names
+    )
+sys.stdout.buffer.write(output)
+sys.exit({status})
+"""
+
+
+@pytest.fixture
+def fake_unrar(tmp_path, monkeypatch):
+    """
+    Install a fake unrar for both this package and rarfile.
+
+    By default it extracts archives made by build_rar; given output, it
+    prints those bytes instead and exits with status. Returns a function
+    listing the archives each 'p' invocation read.
+    """
+    if os.name == 'nt':
+        pytest.skip("fake unrar script needs a POSIX shebang")
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    script = bin_dir / 'unrar'
+    log = bin_dir / 'calls.log'
+    monkeypatch.setattr(rarfile, 'UNRAR_TOOL', str(script))
+    monkeypatch.setattr(rarfile, 'CURRENT_SETUP', None)
+
+    def install(output=None, status=0):
+        script.write_text(f"#!{sys.executable}\n" + FAKE_UNRAR.format(
+            log=str(log), output=output, status=status))
+        script.chmod(0o755)
+
+        def archives_read():
+            calls = log.read_text().splitlines() if log.exists() else []
+            return [[arg for arg in call.split()[1:] if not arg.startswith('-')][0]
+                    for call in calls if call.startswith('p ')]
+
+        return archives_read
+
+    return install
+
+
+@pytest.fixture
+def no_unrar(monkeypatch):
+    monkeypatch.setattr(processor.shutil, 'which', lambda name: None)
+
+
+def _write_rar(tmp_path, members, method=0x30):
+    cbr_path = tmp_path / 'book.cbr'
+    cbr_path.write_bytes(build_rar(members, method))
+    return cbr_path
+
+
+def _read_cbz(cbz_path):
+    with zipfile.ZipFile(cbz_path) as zf:
+        return [(name, zf.read(name)) for name in zf.namelist()]
+
+
+MEMBERS = [('001.jpg', b'abc'), ('002.jpg', b'HELLO'), ('sub/003.jpg', b'xy')]
+# Any method other than stored (0x30) makes rarfile need the unrar tool
+COMPRESSED = 0x33
+
+
+def test_pipe_output_is_split_by_member_sizes(tmp_path, fake_unrar):
+    archives_read = fake_unrar()
+    cbr_path = _write_rar(tmp_path, MEMBERS, COMPRESSED)
+
+    cbz_path = convert_cbr_to_cbz(cbr_path, actual_type='CBR')
+
+    assert cbz_path == tmp_path / 'book.cbz'
+    assert _read_cbz(cbz_path) == MEMBERS
+    assert archives_read() == [str(cbr_path)]
+
+
+def test_stored_archive_is_read_without_unrar(tmp_path, fake_unrar):
+    archives_read = fake_unrar()
+    cbr_path = _write_rar(tmp_path, MEMBERS)
+
+    cbz_path = convert_cbr_to_cbz(cbr_path, actual_type='CBR')
+
+    assert _read_cbz(cbz_path) == MEMBERS
+    assert archives_read() == []
+
+
+@pytest.mark.parametrize('output, status', [
+    (b'abcHELLO', 0),      # short output
+    (b'abcHELLOxyz', 0),   # overlong output
+    (b'abcHELLOxy', 3),    # unrar failure
+])
+def test_bad_pipe_output_fails_and_removes_partial(tmp_path, fake_unrar, output, status):
+    fake_unrar(output, status)
+    cbr_path = _write_rar(tmp_path, MEMBERS, COMPRESSED)
+
+    assert convert_cbr_to_cbz(cbr_path, actual_type='CBR') is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['bin', 'book.cbr']
+
+
+def test_fallback_without_unrar(tmp_path, no_unrar):
+    cbr_path = _write_rar(tmp_path, MEMBERS)
+
+    cbz_path = convert_cbr_to_cbz(cbr_path, actual_type='CBR')
+
+    assert _read_cbz(cbz_path) == MEMBERS
+
+
+def test_unsorted_archive_is_written_sorted(tmp_path, fake_unrar):
+    # The pipe would emit archive order; unsorted archives must not use it
+    archives_read = fake_unrar()
+    cbr_path = _write_rar(tmp_path, list(reversed(MEMBERS)), COMPRESSED)
+
+    cbz_path = convert_cbr_to_cbz(cbr_path, actual_type='CBR')
+
+    assert _read_cbz(cbz_path) == MEMBERS
+    assert str(cbr_path) not in archives_read()
+
+
+def test_hard_linked_source_survives_conversion(tmp_path, no_unrar):
+    # A mislabeled .cbz is linked to .cbr by fix_extension and then
+    # converted back onto the .cbz name
+    cbz_path = tmp_path / 'book.cbz'
+    cbz_path.write_bytes(build_rar(MEMBERS))
+    fixed_path = processor.fix_extension(cbz_path, actual_type='CBR')
+    original = fixed_path.read_bytes()
+
+    assert convert_cbr_to_cbz(fixed_path, actual_type='CBR', replace_existing=True) == cbz_path
+    assert fixed_path.read_bytes() == original
+    assert _read_cbz(cbz_path) == MEMBERS
+
+
+def test_copied_source_is_converted_without_hard_links(tmp_path, no_unrar, monkeypatch):
+    # Filesystems such as FAT or many SMB shares cannot hard-link, so
+    # fix_extension copies and the .cbz is no longer the same file
+    def no_link(src, dst):
+        raise OSError("hard links not supported")
+    monkeypatch.setattr(processor.os, 'link', no_link)
+    cbz_path = tmp_path / 'book.cbz'
+    cbz_path.write_bytes(build_rar(MEMBERS))
+    fixed_path = processor.fix_extension(cbz_path, actual_type='CBR')
+    original = fixed_path.read_bytes()
+    assert not fixed_path.samefile(cbz_path)
+
+    assert convert_cbr_to_cbz(fixed_path, actual_type='CBR', replace_existing=True) == cbz_path
+    assert fixed_path.read_bytes() == original
+    assert _read_cbz(cbz_path) == MEMBERS
+
+
+def test_existing_different_cbz_is_kept(tmp_path, no_unrar):
+    cbr_path = _write_rar(tmp_path, MEMBERS)
+    existing = tmp_path / 'book.cbz'
+    existing.write_bytes(b'keep me')
+
+    assert convert_cbr_to_cbz(cbr_path, actual_type='CBR') is None
+    assert existing.read_bytes() == b'keep me'
@@ -0,0 +1,116 @@
+"""Tests for directory scanning."""
+
+import os
+
+import pytest
+
+from cbr_fixer.scanner import scan_directory
+
+
+def make_tree(root, files):
+    """Create empty files (and their parent directories) below root."""
+    for name in files:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+
+def rel(root, paths):
+    return sorted(os.path.relpath(p, root) for p in paths)
+
+
+def test_recursive_scan(tmp_path):
+    make_tree(tmp_path, [
+        'a.cbr', 'b.CBZ', 'notes.txt',
+        'series/c.cbz', 'series/deep/d.Cbr',
+        'series/book/001.jpg', 'series/book/002.jpg', 'series/book/003.png',
+    ])
+
+    result = scan_directory(tmp_path)
+
+    assert rel(tmp_path, result.cbr_files) == ['a.cbr', os.path.join('series', 'deep', 'd.Cbr')]
+    assert rel(tmp_path, result.cbz_files) == ['b.CBZ', os.path.join('series', 'c.cbz')]
+    assert rel(tmp_path, result.image_sequence_dirs) == [os.path.join('series', 'book')]
+
+
+def test_bare_extension_names_are_not_archives(tmp_path):
+    make_tree(tmp_path, ['.cbr', '.CBZ', 'x.cbr'])
+
+    result = scan_directory(tmp_path)
+
+    assert rel(tmp_path, result.cbr_files) == ['x.cbr']
+    assert result.cbz_files == []
+
+
+def test_non_recursive_scan_checks_direct_subdirectories_only(tmp_path):
+    make_tree(tmp_path, [
+        'a.cbr',
+        'book/1.jpg', 'book/2.jpg', 'book/3.jpg', 'book/inner.cbz',
+        'series/book/1.jpg', 'series/book/2.jpg', 'series/book/3.jpg',
+    ])
+
+    result = scan_directory(tmp_path, recursive=False)
+
+    assert rel(tmp_path, result.cbr_files) == ['a.cbr']
+    assert result.cbz_files == []
+    assert rel(tmp_path, result.image_sequence_dirs) == ['book']
+
+
+def test_top_level_directory_is_not_a_sequence(tmp_path):
+    make_tree(tmp_path, ['1.jpg', '2.jpg', '3.jpg'])
+
+    assert scan_directory(tmp_path).image_sequence_dirs == []
+
+
+@pytest.mark.parametrize('names, expected', [
+    (['01.jpg', '02.jpg', '03.jpg'], True),        # consecutive run
+    (['5.jpg', '6.png'], True),                    # full coverage
+    (['1.jpg', '2.jpg', '4.jpg', '5.jpg'], False), # only pairs, 80% coverage
+    (['1.jpg', '3.jpg'], False),                   # too sparse
+    (['7.jpg'], False),                            # single image
+    (['1.jpg', 'cover.jpg', 'x2.jpg'], False),     # non-numbered names
+])
+def test_sequence_detection(tmp_path, names, expected):
+    make_tree(tmp_path, [f'book/{name}' for name in names])
+
+    result = scan_directory(tmp_path)
+
+    assert (result.image_sequence_dirs != []) is expected
+
+
+def test_sequence_directory_still_collects_its_own_archives(tmp_path):
+    # Detection stops parsing names early but keeps reading the listing
+    make_tree(tmp_path, [f'book/{n:03d}.jpg' for n in range(1, 50)] + ['book/extra.cbz'])
+
+    result = scan_directory(tmp_path)
+
+    assert rel(tmp_path, result.image_sequence_dirs) == ['book']
+    assert rel(tmp_path, result.cbz_files) == [os.path.join('book', 'extra.cbz')]
+
+
+def test_sequence_directories_are_not_descended_into(tmp_path):
+    make_tree(tmp_path, [
+        'book/1.jpg', 'book/2.jpg', 'book/3.jpg',
+        'book/extras/a.cbr', 'book/extras/1.jpg', 'book/extras/2.jpg', 'book/extras/3.jpg',
+    ])
+
+    result = scan_directory(tmp_path)
+
+    assert rel(tmp_path, result.image_sequence_dirs) == ['book']
+    assert result.cbr_files == []
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink') or os.name == 'nt',
+                    reason="symlinks need POSIX")
+def test_symlinked_directories_are_checked_but_archives_not_collected(tmp_path):
+    outside = tmp_path / 'outside'
+    library = tmp_path / 'library'
+    make_tree(outside, ['o.cbr', '1.jpg', '2.jpg', '3.jpg'])
+    make_tree(library, ['a.cbr'])
+    (library / 'link').symlink_to(outside, target_is_directory=True)
+    (library / 'loop').symlink_to(library, target_is_directory=True)
+
+    result = scan_directory(library)
+
+    assert rel(library, result.cbr_files) == ['a.cbr']
+    assert rel(library, result.image_sequence_dirs) == ['link']